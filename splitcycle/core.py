@@ -2,9 +2,21 @@
 
 import os
 from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
 import numpy as np
 from .errors import not_enough_candidates
-from collections import deque
+
+try:
+    import numba
+except ImportError:  # numba is optional; fall back to pure NumPy
+    numba = None
+
+# elections with at most this many candidates are checked in the calling
+# process, since starting a worker pool would cost more than it saves
+MAX_SEQUENTIAL_CANDIDATES = 64
+
+# margins and adjacency shared with each pool worker (see `_init_worker`)
+_worker_state = {}
 
 
 def is_square(matrix):
@@ -17,7 +29,7 @@ def has_reverse_diagonal_symmetry(matrix):
     Check if `matrix` is 2D square with reverse diagonal symmetry
     i.e. `A[i, j] == -A[j, i]` for all `i, j`
     """
-    return is_square(matrix) and np.allclose(matrix, -matrix.T)
+    return is_square(matrix) and np.array_equal(matrix, -matrix.T)
 
 
 def has_zero_diagonal(matrix):
@@ -25,7 +37,20 @@ def has_zero_diagonal(matrix):
     Check if `matrix` is 2D square with zero diagonal entries
     i.e. `A[i, i] == 0` for all `i`
     """
-    return is_square(matrix) and np.allclose(matrix.diagonal(), 0)
+    return is_square(matrix) and not np.any(matrix.diagonal())
+
+
+def _validate_margins(matrix):
+    """
+    Check that `matrix` is a 2D square matrix with zero diagonal entries
+    and reverse diagonal symmetry (`A[i, j] == -A[j, i]`), testing the
+    shape and the diagonal before comparing the full matrix
+    """
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        return False
+    if np.any(matrix.diagonal()):
+        return False
+    return np.array_equal(matrix, -matrix.T)
 
 
 def is_margin_like(matrix):
@@ -33,7 +58,35 @@ def is_margin_like(matrix):
     Check if `matrix` can be used as a voting margins matrix satisfying
     reverse diagonal symmetry and with zero diagonal entries
     """
-    return has_reverse_diagonal_symmetry(matrix) and has_zero_diagonal(matrix)
+    return _validate_margins(matrix)
+
+
+def pack_rows(adjacency):
+    """
+    Pack each row of a square boolean `adjacency` matrix into an integer
+    bitset, where bit `j` of the `i`-th integer is `adjacency[i, j]`
+    """
+    packed = np.packbits(adjacency, axis=1, bitorder="little")
+    return [int.from_bytes(row.tobytes(), "little") for row in packed]
+
+
+def iter_bits(mask):
+    """Yield the indices of the set bits of `mask` in ascending order"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def neighborhood(rows, nodes):
+    """
+    Given packed `rows` (see `pack_rows`) and a bitset of `nodes`,
+    return the bitset of all nodes adjacent to at least one of them
+    """
+    neighbors = 0
+    for node in iter_bits(nodes):
+        neighbors |= rows[node]
+    return neighbors
 
 
 def is_splitcycle_winner(work):
@@ -43,131 +96,213 @@ def is_splitcycle_winner(work):
 
     `work`:
         tuple with:
-        (all_candidates, dfs, considered_candidates, margins)
+        (all_candidates, dfs, considered_candidates, margins, adjacency)
+
+        where `adjacency` maps each threshold `k` to the rows and
+        columns of the boolean matrix `margins >= k`, packed as bitsets
+        (see `pack_rows`); when numba is installed, only the rows for
+        thresholds repeated among one candidate's defeats are needed
 
-    Returns a pruned list of identified winners
+    Returns a boolean mask over all candidates in `margins` that is
+    `False` for every considered candidate found not to be a winner
     """
 
-    def has_strong_path(matrix, source, target, k):
+    def has_strong_path(adjacency, source, target):
         """
-        Given a square `matrix`, return `True` if there is a path from
-        `source` to `target` in the associated directed graph, where
-        each edge has a weight greater than or equal to `k`, and `False`
-        otherwise.
+        Given the packed rows and columns `adjacency` of a boolean
+        matrix (`margins >= k` for some threshold `k`), return `True` if
+        there is a path from `source` to `target` in the associated
+        directed graph, i.e. a path where each edge has a weight greater
+        than or equal to `k`, and `False` otherwise.
         """
-        n = matrix.shape[0]  # `A` is square
+        rows, cols = adjacency
         if source == target:
             return True
 
-        s_visited = np.zeros(n, dtype=bool)
-        t_visited = np.zeros(n, dtype=bool)
-        s_visited[source] = True
-        t_visited[target] = True
-
-        sq = deque([source])
-        tq = deque([target])
-
-        cs = None
-        ct = None
-
-        while sq and tq:
-            if sq:
-                cs = sq.popleft()
-                for neighbor, weight in enumerate(matrix[cs]):
-                    if weight >= k:
-                        if t_visited[neighbor]:
-                            return True
-                        if not s_visited[neighbor]:
-                            s_visited[neighbor] = True
-                            sq.append(neighbor)
-
-            if tq:
-                ct = tq.popleft()
-                for neighbor in range(n):
-                    if matrix[neighbor, ct] >= k:
-                        if s_visited[neighbor]:
-                            return True
-                        if not t_visited[neighbor]:
-                            t_visited[neighbor] = True
-                            tq.append(neighbor)
+        # visited nodes on either side, as bitsets
+        s_visited = 1 << source
+        t_visited = 1 << target
+
+        # nodes found in the last layer on either side
+        s_frontier = s_visited
+        t_frontier = t_visited
+
+        while s_frontier and t_frontier:
+            # grow whichever side has the smaller frontier
+            if s_frontier.bit_count() <= t_frontier.bit_count():
+                # successors along edges of weight at least `k`
+                s_frontier = neighborhood(rows, s_frontier) & ~s_visited
+                s_visited |= s_frontier
+            else:
+                # predecessors along edges of weight at least `k`
+                t_frontier = neighborhood(cols, t_frontier) & ~t_visited
+                t_visited |= t_frontier
+
+            if s_visited & t_visited:
+                # the two searches met
+                return True
 
         return False
 
-    def has_strong_path_dfs(matrix, source, target, k):
+    def has_strong_path_dfs(adjacency, source, target):
         """
-        Given a square `matrix`, return `True` if there is a path from
-        `source` to `target` in the associated directed graph, where
-        each edge has a weight greater than or equal to `k`, and `False`
-        otherwise.
+        Given the packed rows and columns `adjacency` of a boolean
+        matrix (`margins >= k` for some threshold `k`), return `True` if
+        there is a path from `source` to `target` in the associated
+        directed graph, i.e. a path where each edge has a weight greater
+        than or equal to `k`, and `False` otherwise.
 
         This function is equivalent to `has_strong_path` but uses a
         depth-first search implementation instead of breadth-first
         search when searching for strong paths. It is included for
         comparison and testing purposes.
         """
-        n = matrix.shape[0]  # `A` is square
-        # keep track of visited nodes (initially all `False`)
-        visited = np.zeros(n, dtype=bool)
-
-        def dfs(node):
-            """
-            Depth-first search implementation:
-            Search starting from `node` in `matrix` until a path to
-            `target` is found or until all nodes are searched.
-            """
+        rows = adjacency[0]
+        # keep track of visited nodes as a bitset (initially empty)
+        visited = 1 << source
+        # nodes still to be searched, most recently found on top
+        stack = [source]
+
+        while stack:
+            node = stack.pop()
             if node == target:
                 # path to target exists
                 return True
 
-            visited[node] = True  # mark node as visited
-
             # search all neighbors that have not been visited
-            for neighbor, weight in enumerate(matrix[node, :]):
-                if weight >= k and not visited[neighbor]:
-                    if dfs(neighbor):
-                        return True
+            neighbors = rows[node] & ~visited
+            visited |= neighbors
+            stack.extend(iter_bits(neighbors))
 
-            return False
+        return False
 
-        return dfs(source)
+    def strong_reach(adjacency, source):
+        """
+        Given the packed rows and columns `adjacency` of a boolean
+        matrix (`margins >= k` for some threshold `k`), return the
+        bitset of all nodes reachable from `source` along edges with a
+        weight greater than or equal to `k`
+        """
+        rows = adjacency[0]
+        reached = frontier = 1 << source
+        while frontier:
+            frontier = neighborhood(rows, frontier) & ~reached
+            reached |= frontier
+
+        return reached
 
     all_candidates = work[0]
     dfs = work[1]
     finder = has_strong_path_dfs if dfs else has_strong_path
+    # compiled searches that read `margins` directly, if available
+    kernel = None
+    if numba is not None:
+        kernel = _dfs_strong if dfs else _bfs_strong
     considered_candidates = work[2]
-    winners = set(considered_candidates)
     margins = work[3]
+    winners = np.ones(margins.shape[0], dtype=bool)
+    adjacency = work[4]
+    all_candidates = np.asarray(all_candidates)
 
     for a in considered_candidates:
+        losses = all_candidates[margins[a, all_candidates] < 0]
+        if losses.size == 0:
+            # `a` loses to no one, so it cannot be defeated
+            continue
+
+        # try the heaviest defeats first: they need the strongest path
+        # back and are the most likely to eliminate `a`
+        losses = losses[np.argsort(margins[a, losses], kind="stable")]
+
+        # when `a` loses several times by the same margin, one search
+        # from `a` answers all of them; cache it for this `a` only
+        thresholds, counts = np.unique(-margins[a, losses], return_counts=True)
+        shared_thresholds = set(thresholds[counts > 1].tolist())
+        reach = {}
+
         # `a` is not a Condorcet winner
         # if it loses to `b`:
         # >>>   margins[a, b] < 0,
         # in which case `a` is a SplitCycle winner only
         # if it is locked into a Condorcet cycle with `b`:
         # >>>   (margins[a, b] < 0) and \
-        # ...       has_strong_path(margins, a, b, 1)
+        # ...       has_strong_path(margins >= 1, a, b)
         # and
         # if the path in which `b` defeats `a` is one of the weakest
         # paths in that cycle:
-        # >>>   has_strong_path(margins, a, b, -margins[a, b])
+        # >>>   has_strong_path(margins >= -margins[a, b], a, b)
         # putting this altogether, we need to remove `a` from the
         # list of Condorcet winners
         # if `a` loses to `b` and there is no Condorcet cycle
         # including `a` and `b` where the path in which `b` defeats
         # `a` is one of the weakest paths in that cycle:
         # >>>   (margins[a, b] < 0) and not \
-        # ...       has_strong_path(margins, a, b, -margins[a, b])
-        for b in all_candidates:
-            if (margins[a, b] < 0) and not finder(
-                margins, a, b, -margins[a, b]
-            ):
-                winners.discard(a)
+        # ...       has_strong_path(margins >= -margins[a, b], a, b)
+        for b in losses.tolist():
+            k = -margins[a, b]
+            if k in shared_thresholds:
+                if k not in reach:
+                    reach[k] = strong_reach(adjacency[k], a)
+                has_path = (reach[k] >> b) & 1
+            elif kernel is not None:
+                has_path = kernel(margins, a, b, k)
+            else:
+                has_path = finder(adjacency[k], a, b)
+
+            if not has_path:
+                winners[a] = False
                 break
 
     return winners
 
 
-def splitcycle(margins, candidates=None, dfs=True):
+def _init_worker(shm_name, shape, dtype, adjacency):
+    """
+    Attach a pool worker to the margins matrix in shared memory
+    `shm_name` and store the thresholded `adjacency` sent along with it
+    """
+    shm = SharedMemory(name=shm_name)
+    _worker_state["shm"] = shm  # keep the buffer alive in this worker
+    _worker_state["margins"] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _worker_state["adjacency"] = adjacency
+
+
+def _shared_splitcycle_winner(work):
+    """
+    Run `is_splitcycle_winner` in a pool worker, where `work` is
+    `(all_candidates, dfs, considered_candidates)` and the margins and
+    adjacency come from `_init_worker`
+    """
+    return is_splitcycle_winner(
+        (*work, _worker_state["margins"], _worker_state["adjacency"])
+    )
+
+
+def strongest_paths(margins):
+    """
+    Given a margins matrix (as described in `splitcycle`), return the
+    matrix `W` where `W[i, j]` is the strength of the strongest path
+    from `i` to `j`, i.e. the largest `k` for which there is a path from
+    `i` to `j` where each edge has a weight greater than or equal to `k`
+
+    Computed with a max-min variant of the Floyd-Warshall algorithm
+    """
+    if numba is not None:
+        return _strongest_paths_kernel(np.array(margins, order="C"))
+
+    strengths = np.array(margins)
+    for k in range(strengths.shape[0]):
+        # best paths through `k` are bottlenecked by their weakest half
+        np.maximum(
+            strengths,
+            np.minimum(strengths[:, k:k + 1], strengths[k:k + 1, :]),
+            out=strengths,
+        )
+
+    return strengths
+
+
+def splitcycle(margins, candidates=None, dfs=True, closure=False):
     """
     If x has a positive margin over y and there is no path from y back
     to x of strength at least the margin of x over y, then x defeats y.
@@ -186,9 +321,14 @@ def splitcycle(margins, candidates=None, dfs=True):
         if `False`, use breadth-first search instead of default
         depth-first search implementation
 
+    `closure=False`:
+        if `True`, compute the strength of all strongest paths at once
+        (see `strongest_paths`) instead of searching for a strong path
+        for every defeat; `dfs` is ignored
+
     Returns a sorted list of all SplitCycle winners
     """
-    if not is_margin_like(margins):
+    if not _validate_margins(margins):
         raise TypeError(
             "`margins` must be a square matrix with diagonal symmetry "
             "and zero diagonal entries. `margins` represents a "
@@ -211,52 +351,245 @@ def splitcycle(margins, candidates=None, dfs=True):
         )
 
     n = margins.shape[0]  # `margins` is square
+    # keep rows contiguous in memory so that searches read unit-stride data
+    margins = np.ascontiguousarray(margins)
+
+    if candidates is None:
+        # a candidate beating every other candidate is the Condorcet
+        # winner and the only SplitCycle winner; there can be at most
+        # one, and it takes no path searches to find (candidates who
+        # merely never lose do not qualify, as others may tie them)
+        condorcet = np.flatnonzero((margins > 0).sum(axis=1) == n - 1)
+        if condorcet.size:
+            return condorcet.tolist()
 
     # consider all candidates when first called
     candidates = range(n) if candidates is None else candidates
 
-    # prepare multithreading pool
-    cores = os.cpu_count()
-    candidates_per_core = n // cores
-    # distribute workload as equally as possible across available cores
-    pool_sizes = [
-        (candidates_per_core + 1) if (i < n % cores) else candidates_per_core
-        for i in range(cores)
+    if closure:
+        # `a` is defeated by `b` if `a` loses to `b` and the strongest
+        # path from `a` back to `b` is weaker than that defeat
+        opponents = list(candidates)
+        losses = margins[:, opponents] < 0
+        weak = strongest_paths(margins)[:, opponents] < -margins[:, opponents]
+        return np.flatnonzero(~(losses & weak).any(axis=1)).tolist()
+
+    # threshold the margins once for every defeat margin `k` that will
+    # be searched, since many pairs share the same `k`
+    adjacency = {}
+    if numba is not None:
+        # compiled searches read `margins` directly; only the cached
+        # flood fills (for a margin by which a candidate loses more than
+        # once) use packed rows, and never columns
+        opponents = list(candidates)
+        for a in range(n):
+            defeats = -margins[a, opponents]
+            thresholds, counts = np.unique(
+                defeats[defeats > 0], return_counts=True
+            )
+            for k in thresholds[counts > 1].tolist():
+                if k not in adjacency:
+                    adjacency[k] = (pack_rows(margins >= k), None)
+    else:
+        # columns are read from a contiguous transpose so that the
+        # backward searches are unit-stride too
+        margins_T = np.ascontiguousarray(margins.T)
+        for k in np.unique(-margins[margins < 0]):
+            adjacency[k] = (pack_rows(margins >= k), pack_rows(margins_T >= k))
+
+    if n <= MAX_SEQUENTIAL_CANDIDATES:
+        winners = is_splitcycle_winner(
+            (candidates, dfs, range(n), margins, adjacency)
+        )
+        return np.flatnonzero(winners).tolist()
+
+    # prepare multithreading pool, without idle workers
+    cores = min(os.cpu_count(), n)
+
+    # candidates with more losses need more path searches: hand them out
+    # first and in small batches, so that cheap candidates fill in the
+    # tail instead of one worker finishing long after the others
+    loss_counts = (margins[:, list(candidates)] < 0).sum(axis=1)
+    order = np.argsort(-loss_counts, kind="stable").tolist()
+    batch_size = max(1, n // (4 * cores))
+    work = [
+        (candidates, dfs, order[start:start + batch_size])
+        for start in range(0, n, batch_size)
     ]
 
-    # initialize workload by partitioning candidate indices across cores
-    work = []
-    start = 0
-    for size in pool_sizes:
-        work.append((candidates, dfs, range(start, start + size), margins))
-        start += size
+    # share `margins` with the workers instead of pickling it per task
+    shm = SharedMemory(create=True, size=max(margins.nbytes, 1))
+    try:
+        shared = np.ndarray(margins.shape, dtype=margins.dtype, buffer=shm.buf)
+        shared[:] = margins
+        del shared  # release the buffer so that it can be closed below
+
+        # start multithreading
+        with Pool(
+            cores,
+            initializer=_init_worker,
+            initargs=(shm.name, margins.shape, margins.dtype, adjacency),
+        ) as executor:
+            result = list(
+                executor.imap_unordered(_shared_splitcycle_winner, work)
+            )
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # gather results: a candidate wins unless some worker eliminated it
+    winners = np.logical_and.reduce(result)
+
+    return np.flatnonzero(winners).tolist()
+
+
+if numba is not None:
+
+    # not `parallel=True`: numba's thread pool does not survive the
+    # `fork` used to start the workers in `splitcycle`
+    @numba.njit(cache=True)
+    def _margins_kernel(ballots):
+        """Compiled equivalent of `margins_from_ballots`"""
+        n_ballots, n_candidates = ballots.shape
+        margins = np.zeros((n_candidates, n_candidates), np.int64)
+
+        for v in range(n_ballots):
+            ballot = ballots[v]
+            for i in range(n_candidates):
+                rank = ballot[i]
+                for j in range(n_candidates):
+                    # +1 if `i` is preferred to `j`, -1 if `j` is
+                    # preferred to `i`, 0 if tied (branchless)
+                    margins[i, j] += (rank < ballot[j]) - (rank > ballot[j])
+
+        return margins
+
+    @numba.njit(cache=True)
+    def _strongest_paths_kernel(strengths):
+        """Compiled equivalent of `strongest_paths`, in place"""
+        n = strengths.shape[0]
+        for k in range(n):
+            for i in range(n):
+                through = strengths[i, k]
+                for j in range(n):
+                    strength = min(through, strengths[k, j])
+                    if strength > strengths[i, j]:
+                        strengths[i, j] = strength
+
+        return strengths
+
+    @numba.njit(cache=True)
+    def _bfs_strong(margins, source, target, k):
+        """
+        Compiled bidirectional breadth-first search for a path over
+        `margins >= k`, expanding one node from each side in turn
+        """
+        n = margins.shape[0]
+        if source == target:
+            return True
+
+        s_visited = np.zeros(n, np.uint8)
+        t_visited = np.zeros(n, np.uint8)
+        s_visited[source] = 1
+        t_visited[target] = 1
+
+        # fixed-size queues: every node is enqueued at most once per side
+        sq = np.empty(n, np.int32)
+        tq = np.empty(n, np.int32)
+        sq[0] = source
+        tq[0] = target
+        s_head, s_tail = 0, 1
+        t_head, t_tail = 0, 1
+
+        while s_head < s_tail and t_head < t_tail:
+            cs = sq[s_head]
+            s_head += 1
+            for neighbor in range(n):
+                if margins[cs, neighbor] >= k:
+                    if t_visited[neighbor]:
+                        return True
+                    if not s_visited[neighbor]:
+                        s_visited[neighbor] = 1
+                        sq[s_tail] = neighbor
+                        s_tail += 1
+
+            ct = tq[t_head]
+            t_head += 1
+            for neighbor in range(n):
+                # `margins[neighbor, ct] == -margins[ct, neighbor]`, so
+                # predecessors are read from row `ct` with unit stride
+                if -margins[ct, neighbor] >= k:
+                    if s_visited[neighbor]:
+                        return True
+                    if not t_visited[neighbor]:
+                        t_visited[neighbor] = 1
+                        tq[t_tail] = neighbor
+                        t_tail += 1
 
-    # start multithreading
-    with Pool(cores) as executor:
-        result = executor.map(is_splitcycle_winner, work)
+        return False
 
-    # gather results
-    winners = set.union(*result)
+    @numba.njit(cache=True)
+    def _dfs_strong(margins, source, target, k):
+        """Compiled equivalent of `has_strong_path_dfs`"""
+        n = margins.shape[0]
+        visited = np.zeros(n, np.uint8)
+        visited[source] = 1
+
+        # fixed-size stack: every node is pushed at most once
+        stack = np.empty(n, np.int32)
+        stack[0] = source
+        top = 1
+
+        while top:
+            top -= 1
+            node = stack[top]
+            if node == target:
+                return True
+
+            for neighbor in range(n):
+                if margins[node, neighbor] >= k and not visited[neighbor]:
+                    visited[neighbor] = 1
+                    stack[top] = neighbor
+                    top += 1
 
-    return sorted(winners)
+        return False
+
+
+def _margins_numpy(ballots, chunk_size=4096):
+    """
+    NumPy implementation of `margins_from_ballots`, comparing
+    `chunk_size` ballots at once so that the largest intermediate array
+    has shape `(chunk_size, n_candidates)`
+    """
+    # `wins[i, j]` counts the voters who prefer `i` to `j`
+    n_ballots, n_candidates = ballots.shape
+    wins = np.zeros((n_candidates, n_candidates), dtype=np.int64)
+
+    for start in range(0, n_ballots, chunk_size):
+        chunk = ballots[start:start + chunk_size]
+        # loop over the (few) candidates, broadcast over the ballots
+        for j in range(n_candidates):
+            wins[:, j] += np.count_nonzero(chunk < chunk[:, j:j + 1], axis=0)
+
+    return wins - wins.T
 
 
 def margins_from_ballots(ballots):
     """
     Turn a set of ballots (as described in `elect`) into a voting
     margins matrix (as described in `splitcycle`)
-    """
-    # generate initial margins matrix
-    n_candidates = ballots.shape[1]
-    margins = np.zeros((n_candidates, n_candidates))
 
-    comp = np.expand_dims(ballots, axis=2) - np.expand_dims(ballots, axis=1)
-    margins = np.sum(np.where(comp < 0, 1, np.where(comp > 0, -1, 0)), axis=0)
+    Returns an integer (`int32`) margins matrix
+    """
+    if numba is not None:
+        margins = _margins_kernel(np.ascontiguousarray(ballots))
+    else:
+        margins = _margins_numpy(ballots)
 
-    return margins
+    return margins.astype(np.int32)
 
 
-def elect(ballots, candidates, dfs=True):
+def elect(ballots, candidates, dfs=True, closure=False):
     """
     Determine the SplitCycle winners given a set of `ballots` and
     `candidates`
@@ -287,6 +620,10 @@ def elect(ballots, candidates, dfs=True):
         if `True`, use depth-first search to determine the SplitCycle
         winners; if `False`, use breadth-first search
 
+    `closure=False`:
+        if `True`, compute all strongest paths at once instead of
+        searching for them (see `splitcycle`)
+
     Returns a sorted list of all SplitCycle winners
     """
     # check that all candidates are represented in `ballots`
@@ -295,7 +632,7 @@ def elect(ballots, candidates, dfs=True):
 
     # run `splitcycle`
     margins = margins_from_ballots(ballots)
-    winner_indices = splitcycle(margins, dfs=dfs)
+    winner_indices = splitcycle(margins, dfs=dfs, closure=closure)
 
     # map winner indices to candidate names
     return [candidates[i] for i in winner_indices]
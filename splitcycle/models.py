@@ -28,14 +28,11 @@ def ic(n_ballots, n_candidates, ties):
             1, high=n_candidates+1, size=(n_ballots, n_candidates)
         )
     else:
-        # Generate unique random ballots without ties
-        ballots = np.zeros((n_ballots, n_candidates), dtype=int)
-        for i in range(n_ballots):
-            permutation = (
-                np.random.permutation(n_candidates) + 1
-            )  # Ensure 1 to n_candidates
-            ballots[i] = permutation
-        return ballots
+        # Generate unique random ballots without ties: sorting a row of
+        # random keys gives a uniformly random permutation of that row
+        return np.argsort(
+            np.random.random((n_ballots, n_candidates)), axis=1
+        ) + 1  # Ensure 1 to n_candidates
 
 
 def euclidean(n_ballots, n_candidates, n):
@@ -62,8 +59,15 @@ def euclidean(n_ballots, n_candidates, n):
     # generate random voter points
     voters = np.random.uniform(-1, 1, (n_ballots, n))
 
-    distances = np.linalg.norm(
-        candidates[np.newaxis, :, :] - voters[:, np.newaxis, :], axis=2
+    # squared distances rank candidates the same as distances; expand
+    # |v - c|^2 = |v|^2 + |c|^2 - 2 v.c to avoid an (n_ballots,
+    # n_candidates, n) intermediate array
+    voter_norms = np.einsum("ij,ij->i", voters, voters)
+    candidate_norms = np.einsum("ij,ij->i", candidates, candidates)
+    distances = (
+        voter_norms[:, np.newaxis]
+        + candidate_norms[np.newaxis, :]
+        - 2 * (voters @ candidates.T)
     )
 
     return np.argsort(distances, axis=1) + 1
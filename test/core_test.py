@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 from splitcycle import core
 from splitcycle import utils
 
@@ -38,6 +39,68 @@ def test_BFS(benchmark):
     assert result == [4]
 
 
+def test_closure(benchmark):
+    result = benchmark(core.elect, ballots, [1, 2, 3, 4, 5], closure=True)
+    assert result == [4]
+
+
+def test_closure_matches_search():
+    margins = core.margins_from_ballots(
+        utils.gen_random_ballots(15, 8, model="ic")
+    )
+    expected = core.splitcycle(margins)
+    assert core.splitcycle(margins, dfs=False) == expected
+    assert core.splitcycle(margins, closure=True) == expected
+
+
+def test_pool_matches_closure():
+    # enough candidates to be split across a worker pool
+    margins = core.margins_from_ballots(
+        utils.gen_random_ballots(15, core.MAX_SEQUENTIAL_CANDIDATES + 6)
+    )
+    expected = core.splitcycle(margins, closure=True)
+    assert core.splitcycle(margins) == expected
+    assert core.splitcycle(margins, dfs=False) == expected
+
+
+def test_condorcet_winner():
+    margins = -core.margins_from_ballots(tied_ballots)
+    assert core.splitcycle(margins) == [2]
+    assert core.splitcycle(margins, closure=True) == [2]
+
+
+def test_no_strict_condorcet_winner():
+    # candidate 0 ties everyone and never loses, but candidates 1, 2 and
+    # 3 are locked in a cycle of equal strength and are undefeated too
+    margins = np.array(
+        [
+            [0, 0, 0, 0],
+            [0, 0, 1, -1],
+            [0, -1, 0, 1],
+            [0, 1, -1, 0],
+        ]
+    )
+    assert core.splitcycle(margins) == [0, 1, 2, 3]
+    assert core.splitcycle(margins, dfs=False) == [0, 1, 2, 3]
+    assert core.splitcycle(margins, closure=True) == [0, 1, 2, 3]
+
+
+def test_splitcycle_without_numba(monkeypatch):
+    elections = [
+        core.margins_from_ballots(ballots),
+        core.margins_from_ballots(utils.gen_random_ballots(15, 8, model="ic")),
+        core.margins_from_ballots(
+            utils.gen_random_ballots(15, core.MAX_SEQUENTIAL_CANDIDATES + 6)
+        ),
+    ]
+    expected = [core.splitcycle(margins, closure=True) for margins in elections]
+    monkeypatch.setattr(core, "numba", None)
+    for margins, winners in zip(elections, expected):
+        assert core.splitcycle(margins) == winners
+        assert core.splitcycle(margins, dfs=False) == winners
+        assert core.splitcycle(margins, closure=True) == winners
+
+
 def test_margins(benchmark):
     result = benchmark(core.margins_from_ballots, ballots)
     assert result.tolist() == [
@@ -55,3 +118,58 @@ def test_DFS_speed(benchmark):
 
 def test_BFS_speed(benchmark):
     benchmark(core.elect, large_election, [1, 2, 3, 4, 5, 6, 7, 8, 9, 10], dfs=False)
+
+
+def test_closure_speed(benchmark):
+    benchmark(
+        core.elect, large_election, [1, 2, 3, 4, 5, 6, 7, 8, 9, 10], closure=True
+    )
+
+
+tied_ballots = np.array(
+    [
+        [1, 2, 2],
+        [2, 1, 3],
+        [1, 1, 2],
+    ]
+)
+
+tied_margins = [
+    [0, 0, 3],
+    [0, 0, 2],
+    [-3, -2, 0],
+]
+
+
+def test_margins_ties():
+    result = core.margins_from_ballots(tied_ballots)
+    assert result.dtype == np.int32
+    assert result.tolist() == tied_margins
+
+
+def test_rejects_non_margins():
+    for matrix in ([[0, 1], [1, 0]], [[1, -1], [1, 0]], [[0, 1, -1]]):
+        with pytest.raises(TypeError):
+            core.splitcycle(np.array(matrix))
+
+
+def test_margins_chunked():
+    # 25 ballots split into uneven chunks of 4
+    result = core._margins_numpy(ballots, chunk_size=4)
+    assert result.tolist() == core.margins_from_ballots(ballots).tolist()
+    result = core._margins_numpy(tied_ballots, chunk_size=2)
+    assert result.tolist() == tied_margins
+
+
+def test_margins_no_ballots():
+    result = core.margins_from_ballots(np.empty((0, 3), dtype=int))
+    assert result.tolist() == [[0, 0, 0]] * 3
+
+
+def test_margins_numpy_fallback(monkeypatch):
+    expected = core.margins_from_ballots(ballots).tolist()
+    monkeypatch.setattr(core, "numba", None)
+    assert core.margins_from_ballots(ballots).tolist() == expected
+    assert core.margins_from_ballots(tied_ballots).tolist() == tied_margins
+    result = core.margins_from_ballots(np.empty((0, 3), dtype=int))
+    assert result.tolist() == [[0, 0, 0]] * 3
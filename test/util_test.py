@@ -1,3 +1,4 @@
+import numpy as np
 from splitcycle import utils
 
 pytest_plugins = ("benchmark",)
@@ -8,7 +9,9 @@ def test_euclid(benchmark):
 
 
 def test_ic(benchmark):
-    benchmark(utils.gen_random_ballots, 1000, 10, model="ic")
+    result = benchmark(utils.gen_random_ballots, 1000, 10, model="ic")
+    assert result.shape == (1000, 10)
+    assert (np.sort(result, axis=1) == np.arange(1, 11)).all()
 
 
 def test_ic_ties(benchmark):